@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# מדידות ביצועים ל-generate_word_doc.py
+# שימוש: python3 benchmark-word-doc.py [escape fix replace segment balance memory parallel cache basic skeleton startup ...]   (בלי פרמטרים - כל המדידות)
+import sys
+import os
+import io
+import json
+import re
+import timeit
+import contextlib
+
+# הוספת הנתיב הנוכחי למסלול הPython
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_word_doc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_PATH = os.path.join(BASE_DIR, 'test_full_shiur.json')
+# הטקסט הבעייתי של 500 מילים (גם ב-test-python-paragraphs.py)
+SAMPLE_500_WORDS_PATH = os.path.join(BASE_DIR, 'test_500_words.json')
+
+
+def load_sample(path=SAMPLE_PATH):
+    """
+    טוען קובץ בדיקה (ברירת מחדל: test_full_shiur.json) ומחזיר את התמלול
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['transcription']
+
+
+def quiet(func, *args, **kwargs):
+    """
+    מריץ פונקציה בלי ההדפסות ל-stderr
+    """
+    with contextlib.redirect_stderr(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def sample_paragraphs():
+    """
+    פסקאות אמיתיות: התמלול אחרי תיקון העברית, מחולק לפי משפטים לגושים של ~400 תווים
+    """
+    text = quiet(generate_word_doc.fix_hebrew_punctuation, load_sample())
+    paragraphs, current = [], ''
+    for sentence in re.split(r'(?<=[.!?:])\s+', text):
+        current += sentence + ' '
+        if len(current) >= 400:
+            paragraphs.append(current.strip())
+            current = ''
+    if current.strip():
+        paragraphs.append(current.strip())
+    return paragraphs
+
+
+def report(name, seconds, number, unit='call'):
+    print(f"  {name:<34} {seconds / number * 1e6:10.1f} µs/{unit}")
+
+
+def bench_escape():
+    """
+    הברחת XML: שרשרת ה-replace הישנה מול escape_xml ו-escape_xml_paragraphs
+    """
+    paragraphs = sample_paragraphs()
+    number = 2000
+    translate_table = str.maketrans(dict(generate_word_doc._XML_ESCAPES))
+    profile = generate_word_doc.get_language_profile('Hebrew')
+
+    def old_chain(text):
+        return (text.replace('&', '&amp;')
+                   .replace('<', '&lt;')
+                   .replace('>', '&gt;')
+                   .replace('"', '&quot;')
+                   .replace("'", '&#39;'))
+
+    def per_paragraph(escape):
+        return b''.join(profile.paragraph_open + escape(text).encode('utf-8') + profile.paragraph_close
+                        for text in paragraphs)
+
+    expected = per_paragraph(old_chain)
+    assert per_paragraph(generate_word_doc.escape_xml) == expected
+    assert generate_word_doc.escape_xml_paragraphs(paragraphs, profile.paragraph_open, profile.paragraph_close) == expected
+
+    print(f"escape: {len(paragraphs)} paragraphs, {sum(map(len, paragraphs))} chars "
+          f"({sum(text.count(chr(34)) for text in paragraphs)} quotes)")
+    report('old replace chain', timeit.timeit(lambda: per_paragraph(old_chain), number=number), number, 'doc')
+    report('str.translate', timeit.timeit(lambda: per_paragraph(lambda t: t.translate(translate_table)), number=number), number, 'doc')
+    report('escape_xml', timeit.timeit(lambda: per_paragraph(generate_word_doc.escape_xml), number=number), number, 'doc')
+    report('escape_xml_paragraphs', timeit.timeit(
+        lambda: generate_word_doc.escape_xml_paragraphs(paragraphs, profile.paragraph_open, profile.paragraph_close),
+        number=number), number, 'doc')
+
+    plain = 'שלום עולם ' * 40
+    report('escape_xml (no special chars)', timeit.timeit(lambda: generate_word_doc.escape_xml(plain), number=number * 10), number * 10)
+
+
+def bench_fix():
+    """
+    תיקון העברית: בניית המנוע (פעם אחת לתהליך) והרצתו על התמלול ועל פסקה קצרה
+    """
+    text = load_sample()
+    number = 200
+    paragraph = sample_paragraphs()[0]
+
+    print(f"fix: {len(text)} chars, {len(generate_word_doc.get_hebrew_fix_engine().rules)} rules")
+    report('build_hebrew_fix_engine', timeit.timeit(generate_word_doc.build_hebrew_fix_engine, number=20), 20)
+    engine = generate_word_doc.get_hebrew_fix_engine()
+    report('engine.apply (transcription)', timeit.timeit(lambda: engine.apply(text), number=number), number, 'doc')
+    report('engine.apply (paragraph)', timeit.timeit(lambda: engine.apply(paragraph), number=number * 10), number * 10)
+    # פסקה בלי גרשיים - קבוצות הכללים של הגרשיים מדולגות
+    plain = paragraph.replace('"', '')
+    report('engine.apply (no quotes)', timeit.timeit(lambda: engine.apply(plain), number=number * 10), number * 10)
+    report('engine.apply + FixStats', timeit.timeit(lambda: engine.apply(text, generate_word_doc.FixStats()), number=number), number, 'doc')
+
+
+def bench_replace():
+    """
+    MultiReplacer מול text.replace סדרתי, כשהטבלה גדלה
+    """
+    text = load_sample()
+    words = sorted(set(re.findall(r'[א-ת]{3,}', text)))
+    number = 20
+
+    print(f"replace: {len(text)} chars")
+    for size in (100, 1000, 10000):
+        # מילים אמיתיות מהטקסט + מילים בדויות שלא מופיעות בו
+        pairs = [(f'{word}"', word) for word in words[:size]]
+        pairs += [(f'קקק{index}', 'ק') for index in range(size - len(pairs))]
+
+        def sequential():
+            result = text
+            for wrong, correct in pairs:
+                result = result.replace(wrong, correct)
+            return result
+
+        ordered = generate_word_doc.MultiReplacer(pairs, ordered=True)
+        single_pass = generate_word_doc.MultiReplacer(pairs)
+        assert ordered.replace(text) == sequential()
+        report(f'sequential replace ({size})', timeit.timeit(sequential, number=number), number, 'doc')
+        report(f'MultiReplacer ordered ({size})', timeit.timeit(lambda: ordered.replace(text), number=number), number, 'doc')
+        report(f'MultiReplacer single pass ({size})', timeit.timeit(lambda: single_pass.replace(text), number=number), number, 'doc')
+
+
+def legacy_paragraphs(all_text):
+    """
+    לולאת החלוקה הישנה (current_para += ... ו-count על כל הפסקה אחרי כל משפט) - להשוואה
+    (המרכאות נספרות כמו בחלוקה החדשה, בלי גרשיים של ראשי תיבות)
+    """
+    paragraphs, current_para, sentence_count = [], '', 0
+    for sentence in re.split(r'(?<=[.!?:])\s+', all_text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        current_para += sentence + ' '
+        sentence_count += 1
+        if sentence_count >= 4 and len(current_para) >= 400 and generate_word_doc.count_quotes(current_para) % 2 == 0:
+            paragraphs.append(current_para.strip())
+            current_para, sentence_count = '', 0
+    if current_para.strip():
+        paragraphs.append(current_para.strip())
+    return paragraphs
+
+
+def bench_segment():
+    """
+    חלוקה לפסקאות: הלולאה הישנה מול create_smart_paragraphs_python ו-paragraph_texts,
+    על 500 המילים, על התמלול ועל תמלול ארוך פי 25
+    (ציטוט פתוח באמצע הטקסט מונע סגירת פסקה - המקרה הריבועי של הלולאה הישנה)
+    """
+    words_500 = load_sample(SAMPLE_500_WORDS_PATH)
+    text = quiet(generate_word_doc.fix_hebrew_punctuation, load_sample())
+    long_text = ' '.join([text] * 25)
+    unbalanced = text.replace('"', '') + ' "' + ' '.join([text.replace('"', '')] * 25)
+
+    spans = generate_word_doc.create_smart_paragraphs_python
+    segment = generate_word_doc.paragraph_texts
+
+    samples = (('500 words', words_500, 500), ('transcription', text, 200),
+               ('x25', long_text, 10), ('x25 open quote', unbalanced, 3))
+    for name, sample, number in samples:
+        assert segment(sample) == legacy_paragraphs(sample)
+        assert [generate_word_doc.paragraph_text(sample, span) for span in spans(sample)] == segment(sample)
+        print(f"segment ({name}): {len(sample)} chars, {len(spans(sample))} paragraphs")
+        report('legacy loop', timeit.timeit(lambda: legacy_paragraphs(sample), number=number), number, 'doc')
+        report('create_smart_paragraphs_python', timeit.timeit(lambda: spans(sample), number=number), number, 'doc')
+        report('paragraph_texts', timeit.timeit(lambda: segment(sample), number=number), number, 'doc')
+
+    # פסקאות ארוכות יותר (8 משפטים, 800 תווים) - אותו מעבר, פחות פסקאות
+    print(f"segment (transcription, 8/800): {len(spans(text, 8, 800))} paragraphs")
+    report('create_smart_paragraphs_python', timeit.timeit(lambda: spans(text, 8, 800), number=200), 200, 'doc')
+
+
+def paragraph_shape(spans):
+    """
+    איזון החלוקה: כמה פסקאות, סטיית התקן של האורכים והפסקה האחרונה
+    """
+    lengths = [end - start for start, end in spans]
+    mean = sum(lengths) / len(lengths)
+    deviation = (sum((length - mean) ** 2 for length in lengths) / len(lengths)) ** 0.5
+    return f"{len(lengths)} paragraphs, mean {mean:.0f} ± {deviation:.0f} chars, last {lengths[-1]}"
+
+
+def bench_balance():
+    """
+    חלוקה greedy מול balanced (תכנון דינמי עם חלון חסום): זמן ואיזון האורכים,
+    על התמלול המתוקן ועל תמלול של ~3 שעות (פי 25 ופי 100)
+    """
+    text = quiet(generate_word_doc.fix_hebrew_punctuation, load_sample())
+    spans = generate_word_doc.create_smart_paragraphs_python
+
+    for name, sample, number in (('transcription', text, 200), ('x25', ' '.join([text] * 25), 10),
+                                 ('x100', ' '.join([text] * 100), 3)):
+        print(f"balance ({name}): {len(sample)} chars")
+        for mode in generate_word_doc.PARAGRAPH_MODES:
+            print(f"  {mode:<8} {paragraph_shape(spans(sample, mode=mode))}")
+            report(mode, timeit.timeit(lambda: spans(sample, mode=mode), number=number), number, 'doc')
+
+
+def bench_memory():
+    """
+    שיא הזיכרון (tracemalloc) של כתיבת מסמך מתבנית לקובץ, ביחס לגודל התמלול:
+    תמלול ארוך (פי 100) מחולק לסעיפים, ואותו תמלול כגוש אחד
+    """
+    import tempfile
+    import tracemalloc
+
+    text = load_sample()
+    sectioned = '\n\n'.join([text] * 100)
+    single_block = ' '.join(' '.join([text] * 100).split('\n\n'))
+    # המטמון של התבנית ומנוע התיקון נבנים פעם אחת לתהליך - לא חלק מהמדידה
+    quiet(generate_word_doc.render_docx_bytes, text, 'כותרת')
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, 'memory.docx')
+        for name, sample in (('sections', sectioned), ('single block', single_block)):
+            tracemalloc.start()
+            quiet(generate_word_doc.create_hebrew_word_document, sample, 'כותרת', output_path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = len(sample.encode('utf-8'))
+            print(f"memory ({name}): {size / 1e6:.1f} MB transcription, "
+                  f"peak {peak / 1e6:.1f} MB ({peak / size:.1f}x), docx {os.path.getsize(output_path) / 1e3:.0f} KB")
+
+
+def bench_parallel():
+    """
+    תיקון העברית של גוש יחיד ארוך (פי 40, ~160K תווים): בתהליך עצמו מול רסיסים במאגר התהליכים
+    (המאגר נוצר בקריאה הראשונה; על מכונה עם ליבה אחת אין מה להרוויח - רק את התקורה)
+    """
+    text = ' '.join(' '.join([load_sample()] * 40).split('\n\n'))
+    engine = generate_word_doc.get_hebrew_fix_engine()
+    workers = max(2, os.cpu_count() or 1)
+    number = 5
+
+    shards = generate_word_doc.split_fix_shards(text)
+    assert quiet(generate_word_doc.fix_hebrew_punctuation_sharded, text, workers) == engine.apply(text)
+    print(f"parallel: {len(text)} chars, {len(shards)} shards, {workers} processes ({os.cpu_count()} cores)")
+    report('split_fix_shards', timeit.timeit(lambda: generate_word_doc.split_fix_shards(text), number=number), number, 'doc')
+    report('in-process', timeit.timeit(lambda: engine.apply(text), number=number), number, 'doc')
+    report('sharded pool', timeit.timeit(
+        lambda: quiet(generate_word_doc.fix_hebrew_punctuation_sharded, text, workers), number=number), number, 'doc')
+
+
+def bench_cache():
+    """
+    רינדור חוזר של אותו מסמך: מטמון פסקאות ריק מול מלא (סעיפים של גמיני, וגוש יחיד)
+    """
+    text = load_sample()
+    sectioned = '\n\n'.join(text.replace('\n\n', ' ').split('. '))
+    single_block = ' '.join(text.split('\n\n'))
+    cache = generate_word_doc._PARAGRAPH_CACHE
+    number = 50
+
+    def render(sample):
+        return quiet(generate_word_doc.render_docx_bytes, sample, 'כותרת')
+
+    render(text)
+    for name, sample in (('sections', sectioned), ('single block', single_block)):
+        cache.clear()
+        cache.reset_counters()
+        cold = render(sample)
+        assert render(sample) == cold
+        print(f"cache ({name}): {len(sample)} chars, {len(cache.entries)} entries, {cache.size} bytes")
+
+        def render_cold():
+            cache.clear()
+            return render(sample)
+
+        report('empty cache', timeit.timeit(render_cold, number=number), number, 'doc')
+        report('warm cache', timeit.timeit(lambda: render(sample), number=number), number, 'doc')
+        print(f"  counters: {cache.as_dict()}")
+
+
+def legacy_basic_docx(text, title):
+    """
+    המסמך הבסיסי (LTR) כמו שנבנה קודם - מודל האובייקטים של python-docx
+    """
+    from docx import Document
+    from docx.shared import Pt
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    doc = Document()
+    title_paragraph = doc.add_paragraph()
+    title_run = title_paragraph.add_run(title)
+    title_run.font.name = 'David'
+    title_run.font.size = Pt(18)
+    title_run.bold = True
+    title_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    doc.add_paragraph()
+    for section in generate_word_doc.iter_basic_paragraph_texts(text, False):
+        paragraph = doc.add_paragraph()
+        run = paragraph.add_run(section)
+        run.font.name = 'David'
+        run.font.size = Pt(14)
+        paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    output = io.BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def bench_basic():
+    """
+    מסמך LTR בלי תבנית: כתיבה ישירה מקטעי XML מול python-docx (אם מותקן)
+    """
+    text = load_sample()
+    sectioned = '\n\n'.join(text.replace('\n\n', ' ').split('. '))
+    number = 20
+
+    print(f"basic: {len(sectioned)} chars, {sectioned.count(chr(10) * 2) + 1} paragraphs")
+    quiet(generate_word_doc.render_basic_docx_bytes, sectioned, 'Title', 'English')
+    report('direct OOXML', timeit.timeit(
+        lambda: quiet(generate_word_doc.render_basic_docx_bytes, sectioned, 'Title', 'English'), number=number),
+        number, 'doc')
+    try:
+        import docx
+    except ImportError:
+        print("  python-docx not installed - skipping the comparison")
+        return
+    report('python-docx', timeit.timeit(lambda: quiet(legacy_basic_docx, sectioned, 'Title'), number=number),
+           number, 'doc')
+
+
+def bench_skeleton():
+    """
+    טעינה קרה של תבנית ה-RTL: פריסה, תיקון ודחיסה מה-docx מול מיפוי השלד המקומפל (--compile-template)
+    (על עותק של התבנית בתיקייה זמנית - השלד לא נכתב לתיקיית הפרויקט)
+    """
+    import shutil
+    import tempfile
+
+    template = quiet(generate_word_doc.get_template_registry().get)
+    number = 50
+
+    with tempfile.TemporaryDirectory() as directory:
+        template_path = shutil.copy2(template.path, directory)
+        skeleton_path, size = quiet(generate_word_doc.compile_template_skeleton, template_path)
+
+        def from_docx():
+            return quiet(generate_word_doc._build_template_parts, template_path, 'he-IL')
+
+        def from_skeleton():
+            parts = quiet(generate_word_doc.load_template_skeleton, template_path, 'he-IL')
+            generate_word_doc.release_template_parts(parts)
+            return parts
+
+        assert from_skeleton() is not None
+        print(f"skeleton: {os.path.basename(template.path)} -> {size} bytes")
+        report('parts from .docx', timeit.timeit(from_docx, number=number), number, 'load')
+        report('parts from skeleton (mmap)', timeit.timeit(from_skeleton, number=number), number, 'load')
+
+
+# תקציב זמן ההפעלה (חציון, מילישניות) - bench_startup נכשל כשעוברים אותו
+# first byte: מהפעלת `python -m generate_word_doc --stdio` עם תמלול של 1KB ועד הבית הראשון של התשובה
+STARTUP_RUNS = 5
+STARTUP_BUDGET_MS = {
+    'import generate_word_doc': 25,
+    'first byte (Hebrew, template)': 90,
+    'first byte (English, basic)': 60,
+}
+
+
+def copy_deployment(directory):
+    """
+    מעתיק לתיקייה את מה שנפרס (המודול, מילון ראשי התיבות, השלד הבסיסי והתבניות) -
+    מדידות ההפעלה מקמפלות שם bytecode ושלדים, ותיקיית הפרויקט לא משתנה
+    """
+    import shutil
+
+    names = ['generate_word_doc.py', generate_word_doc.HEBREW_ACRONYMS_FILE, generate_word_doc.BASIC_TEMPLATE_FILE]
+    names += [filename for template_id, filename in generate_word_doc.TEMPLATE_FILES]
+    for name in names:
+        source = os.path.join(BASE_DIR, name)
+        if os.path.exists(source):
+            shutil.copy2(source, directory)
+
+
+def measure_first_byte(job, directory=BASE_DIR):
+    """
+    זמן מהפעלת תהליך `-m generate_word_doc --stdio` חדש ועד הבית הראשון ב-stdout (כולל עליית המפרש)
+    """
+    import subprocess
+
+    start = timeit.default_timer()
+    # כמו server.js: python -m, כך שה-bytecode המקומפל נטען
+    process = subprocess.Popen([sys.executable, '-m', 'generate_word_doc', '--stdio'],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               cwd=directory)
+    process.stdin.write(json.dumps(job, ensure_ascii=False).encode('utf-8'))
+    process.stdin.close()
+    process.stdout.read(1)
+    elapsed = timeit.default_timer() - start
+    process.stdout.read()
+    process.wait()
+    return elapsed
+
+
+def measure_import(directory=BASE_DIR):
+    """
+    זמן ה-import של generate_word_doc בתהליך חדש (בלי עליית המפרש עצמו)
+    """
+    import subprocess
+
+    code = ('import time; start = time.perf_counter(); import generate_word_doc; '
+            'print(time.perf_counter() - start)')
+    output = subprocess.run([sys.executable, '-c', code], cwd=directory, capture_output=True, check=True).stdout
+    return float(output)
+
+
+def import_profile(top=6, directory=BASE_DIR):
+    """
+    המודולים היקרים ביותר ב-import של generate_word_doc (python -X importtime, זמן מצטבר)
+    """
+    import subprocess
+
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import generate_word_doc'],
+                            cwd=directory, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def bench_startup():
+    """
+    הפעלה קרה (מייל עם הקלטה קצרה = תהליך חדש למסמך אחד): import ו-time-to-first-byte מול התקציב
+    נמדד על עותק בתיקייה זמנית (copy_deployment) - ה-bytecode והשלד לא נכתבים לתיקיית הפרויקט
+    """
+    import compileall
+    import statistics
+    import subprocess
+    import tempfile
+
+    text = load_sample()[:1024]
+
+    with tempfile.TemporaryDirectory() as directory:
+        # כמו בפריסה (Dockerfile / build.sh): ה-bytecode ושלד התבנית מקומפלים מראש
+        copy_deployment(directory)
+        compileall.compile_file(os.path.join(directory, 'generate_word_doc.py'), quiet=1)
+        subprocess.run([sys.executable, '-m', 'generate_word_doc', '--compile-template'],
+                       cwd=directory, capture_output=True, check=True)
+
+        measurements = {
+            'import generate_word_doc': lambda: measure_import(directory),
+            'first byte (Hebrew, template)': lambda: measure_first_byte(
+                {"transcription": text, "title": "כותרת", "language": "Hebrew"}, directory),
+            'first byte (English, basic)': lambda: measure_first_byte(
+                {"transcription": text, "title": "Title", "language": "English"}, directory),
+        }
+
+        print(f"startup: {len(text)} chars, median of {STARTUP_RUNS} runs")
+        ok = True
+        for name, measure in measurements.items():
+            milliseconds = statistics.median(measure() for _ in range(STARTUP_RUNS)) * 1000
+            budget = STARTUP_BUDGET_MS[name]
+            status = 'ok' if milliseconds <= budget else 'OVER BUDGET'
+            print(f"  {name:<34} {milliseconds:10.1f} ms   (budget {budget} ms) {status}")
+            ok = ok and milliseconds <= budget
+
+        print("  import profile (cumulative):")
+        for microseconds, module in import_profile(directory=directory):
+            print(f"    {module:<32} {microseconds / 1000:10.1f} ms")
+    return ok
+
+
+BENCHMARKS = {
+    'escape': bench_escape,
+    'fix': bench_fix,
+    'replace': bench_replace,
+    'segment': bench_segment,
+    'balance': bench_balance,
+    'memory': bench_memory,
+    'parallel': bench_parallel,
+    'cache': bench_cache,
+    'basic': bench_basic,
+    'skeleton': bench_skeleton,
+    'startup': bench_startup,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    failed = []
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            sys.exit(1)
+        # מדידה עם תקציב (startup) מחזירה False כשהיא חורגת ממנו
+        if BENCHMARKS[name]() is False:
+            failed.append(name)
+    if failed:
+        print(f"Over budget: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
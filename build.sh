@@ -8,6 +8,12 @@ npm install
 echo "🐍 Installing Python dependencies..."
 pip install -r requirements.txt
 
+echo "🐍 Precompiling the Word generator (faster worker startup)..."
+python3 -m compileall -q generate_word_doc.py
+
+echo "🐍 Compiling the Word template skeleton..."
+python3 -m generate_word_doc --compile-template
+
 echo "🔧 Making sure build.sh is executable..."
 chmod +x build.sh
 
@@ -2995,121 +2995,305 @@ async function createWordDocument(transcription, filename, duration) {
   }
 }
 
-// NEW: Python-based Word document creation
-async function createWordDocumentPython(transcription, filename, duration, language = 'Hebrew') {
-  try {
-    const cleanName = cleanFilename(filename);
-    console.log(`🐍 Creating Word document using Python for: ${cleanName} (Language: ${language})`);
-
-    const { spawn } = require('child_process');
-    const path = require('path');
-    const fs = require('fs');
+// 🐍 Binary frames from generate_word_doc.py (--stdio / --serve --frames):
+// סוג (בית אחד: D=docx, J=תוצאת JSON) + אורך (4 בתים big-endian) + תוכן
+function createPythonFrameReader(onFrame) {
+  let buffer = Buffer.alloc(0);
+  return (chunk) => {
+    buffer = buffer.length ? Buffer.concat([buffer, chunk]) : chunk;
+    while (buffer.length >= 5) {
+      const length = buffer.readUInt32BE(1);
+      if (buffer.length < 5 + length) break;
+      const kind = String.fromCharCode(buffer[0]);
+      const payload = buffer.subarray(5, 5 + length);
+      buffer = buffer.subarray(5 + length);
+      onFrame(kind, payload);
+    }
+  };
+}
 
-    // יצירת נתיב לקובץ הפלט
-    const outputPath = path.join(__dirname, 'output', `${cleanName}.docx`);
+// 🐍 Persistent Python workers (generate_word_doc.py --serve --frames)
+// מאגר קטן של תהליכי Python שנשארים חיים ומקבלים משימות JSON בשורות דרך stdin -
+// חוסך הפעלת מפרש, בניית מנוע התיקון וטעינת התבנית בכל מסמך.
+// כל worker מריץ משימה אחת בכל פעם, ולכן יש עד worker לליבה - כמה מסמכים שמסתיימים יחד
+// עדיין נבנים במקביל, כמו בתהליך-למסמך. המחיר: הזיכרון של כמה מפרשים חיים
+// PYTHON_WORKERS=N - גודל המאגר (ברירת מחדל: מספר הליבות, עד 4)
+const PYTHON_WORKER_JOB_TIMEOUT_MS = 120000;
+const PYTHON_WORKER_POOL_SIZE = Math.max(1, parseInt(process.env.PYTHON_WORKERS, 10)
+  || Math.min(require('os').cpus().length, 4));
+const pythonWordWorkers = [];
+
+function startPythonWordWorker() {
+  const pythonCmd = process.platform === 'win32' ? 'python' : 'python3';
+  // -m ולא נתיב הסקריפט: כך נטען ה-bytecode המקומפל מראש (סקריפט תמיד מקומפל מהמקור)
+  const child = spawn(pythonCmd, ['-m', 'generate_word_doc', '--serve', '--frames'], {
+    cwd: __dirname,
+    stdio: ['pipe', 'pipe', 'pipe']
+  });
 
-    // וידוא שתיקיית output קיימת
-    const outputDir = path.dirname(outputPath);
-    if (!fs.existsSync(outputDir)) {
-      fs.mkdirSync(outputDir, { recursive: true });
-    }
+  const worker = {
+    child,
+    nextJobId: 1,
+    // jobId -> { job, resolve, reject, timer } לפי סדר הכתיבה - הראשונה היא זו שרצה עכשיו
+    pending: new Map(),
+    pendingDocument: null, // מסגרת D שמחכה למסגרת J שאחריה
+    stderrTail: '',
+    dead: false
+  };
 
-    // הכנת הנתונים לסקריפט Python
-    const pythonData = JSON.stringify({
-      transcription: transcription,
-      title: cleanName,
-      output_path: outputPath,
-      language: language || 'Hebrew'
+  // worker שנפל: המשימה שרצה בו נכשלת (ועוברת להרצה החד-פעמית),
+  // והמשימות שרק חיכו בתור שלו עוברות ל-worker אחר
+  const retire = (error) => {
+    if (worker.dead) return;
+    worker.dead = true;
+    const index = pythonWordWorkers.indexOf(worker);
+    if (index !== -1) {
+      pythonWordWorkers.splice(index, 1);
+    }
+    const entries = [...worker.pending.values()];
+    worker.pending.clear();
+    entries.forEach((entry, position) => {
+      clearTimeout(entry.timer);
+      if (position === 0 && entry.timer) {
+        entry.reject(error);
+      } else {
+        dispatchPythonWorkerJob(entry);
+      }
     });
+  };
+
+  // השעון של משימה מתחיל כשה-worker מגיע אליה (ראש התור), לא כשהיא נכנסת לתור
+  worker.startHeadTimer = () => {
+    const head = worker.pending.entries().next();
+    if (head.done || head.value[1].timer) return;
+    const [id, entry] = head.value;
+    entry.timer = setTimeout(() => {
+      // משימה תקועה - רק היא נכשלת; ה-worker נהרג והתור שלו עובר ל-worker אחר
+      worker.pending.delete(id);
+      entry.reject(new Error(`Python worker job timed out after ${PYTHON_WORKER_JOB_TIMEOUT_MS / 1000} seconds`));
+      retire(new Error('Python worker killed after a job timeout'));
+      child.kill();
+    }, PYTHON_WORKER_JOB_TIMEOUT_MS);
+  };
 
-    // יצירת קובץ זמני עבור הנתונים
-    const tempDataPath = path.join(__dirname, `temp_data_${Date.now()}_${Math.random().toString(36).substr(2, 9)}.json`);
+  child.stdout.on('data', createPythonFrameReader((kind, payload) => {
+    if (kind === 'D') {
+      worker.pendingDocument = Buffer.from(payload);
+      return;
+    }
 
+    const document = worker.pendingDocument;
+    worker.pendingDocument = null;
     try {
-      fs.writeFileSync(tempDataPath, pythonData, 'utf8');
-    } catch (error) {
-      console.error('❌ Failed to write temp data file:', error);
-      throw new Error('Failed to prepare data for Python script');
+      const result = JSON.parse(payload.toString('utf8'));
+      const job = worker.pending.get(result.id);
+      if (!job) return;
+      worker.pending.delete(result.id);
+      clearTimeout(job.timer);
+      job.resolve({ result, document });
+      worker.startHeadTimer();
+    } catch (parseError) {
+      console.error('❌ Error parsing Python worker result frame:', parseError);
+    }
+  }));
+
+  child.stderr.on('data', (data) => {
+    // שומרים רק את הסוף - מודפס רק כשמשימה נכשלת
+    worker.stderrTail = (worker.stderrTail + data.toString()).slice(-8000);
+  });
+
+  child.on('exit', (code, signal) => {
+    console.warn(`⚠️ Python worker exited (code=${code}, signal=${signal})`);
+    retire(new Error(`Python worker exited with code ${code}: ${worker.stderrTail}`));
+  });
+
+  child.on('error', (error) => {
+    console.error('❌ Error spawning Python worker:', error);
+    retire(error);
+  });
+
+  // worker שמת באמצע כתיבת משימה - EPIPE על stdin. בלי listener השגיאה מפילה את כל השרת;
+  // כך ה-worker מסומן כמת, והמשימה שרצה בו עוברת להרצה החד-פעמית
+  child.stdin.on('error', (error) => {
+    console.error('❌ Error writing to Python worker:', error.message);
+    retire(new Error(`Python worker stdin failed: ${error.message}`));
+    child.kill();
+  });
+
+  // PYTHON_PARAGRAPH_CACHE_MB=N - גבול מטמון הפסקאות של ה-worker (ברירת מחדל: 32MB, 0 = כבוי)
+  // תשובת הפקודה חוזרת בלי id ולכן לא מגיעה לאף משימה
+  if (process.env.PYTHON_PARAGRAPH_CACHE_MB) {
+    const maxBytes = Math.round(parseFloat(process.env.PYTHON_PARAGRAPH_CACHE_MB) * 1024 * 1024);
+    child.stdin.write(JSON.stringify({ command: 'paragraph_cache', max_bytes: maxBytes }) + '\n');
+  }
+
+  pythonWordWorkers.push(worker);
+  console.log(`🐍 Started persistent Python worker (pid ${child.pid}, ${pythonWordWorkers.length}/${PYTHON_WORKER_POOL_SIZE})`);
+  return worker;
+}
+
+// ה-worker עם התור הקצר ביותר; worker חדש רק כשכולם עסוקים והמאגר עוד לא מלא
+function getPythonWordWorker() {
+  let idlest = null;
+  for (const worker of pythonWordWorkers) {
+    if (!idlest || worker.pending.size < idlest.pending.size) {
+      idlest = worker;
     }
+  }
+  if (idlest && (idlest.pending.size === 0 || pythonWordWorkers.length >= PYTHON_WORKER_POOL_SIZE)) {
+    return idlest;
+  }
+  return startPythonWordWorker();
+}
 
-    // קריאה לסקריפט Python עם נתיב לקובץ הנתונים
-    return new Promise((resolve, reject) => {
-      const pythonCmd = process.platform === 'win32' ? 'python' : 'python3';
-      const pythonProcess = spawn(pythonCmd, ['generate_word_doc.py', tempDataPath], {
-        cwd: __dirname,
-        stdio: ['pipe', 'pipe', 'pipe']
-      });
+function dispatchPythonWorkerJob(entry) {
+  const worker = getPythonWordWorker();
+  const id = worker.nextJobId++;
+  entry.timer = null;
+  worker.pending.set(id, entry);
+  worker.child.stdin.write(JSON.stringify({ ...entry.job, id }) + '\n');
+  worker.startHeadTimer();
+}
 
-      let output = '';
-      let errorOutput = '';
+function runPythonWorkerJob(job) {
+  return new Promise((resolve, reject) => {
+    dispatchPythonWorkerJob({ job, resolve, reject, timer: null });
+  });
+}
 
-      pythonProcess.stdout.on('data', (data) => {
-        output += data.toString();
-      });
+// זמני השלבים של משימת Python (result.timings) - שורת JSON אחת לכל מסמך, כדי שאפשר יהיה לחתוך את הלוג לגרפים
+// השלבים: parse, template, normalise, fix, segment, render, zip (כל אחד בלעדי, ביחד בערך total_ms)
+function logPythonTimings(cleanName, timings) {
+  if (!timings) {
+    return;
+  }
+  console.log(`⏱️ Python timings: ${JSON.stringify({ file: cleanName, ...timings })}`);
+}
 
-      pythonProcess.stderr.on('data', (data) => {
-        errorOutput += data.toString();
-      });
+// NEW: Python-based Word document creation - דרך ה-worker הקבוע, עם נפילה להרצה חד-פעמית
+// המסמך חוזר ישירות ב-stdout - בלי קבצי temp_data ובלי תיקיית output
+async function createWordDocumentPython(transcription, filename, duration, language = 'Hebrew') {
+  const cleanName = cleanFilename(filename);
+  const job = {
+    transcription: transcription,
+    title: cleanName,
+    language: language || 'Hebrew'
+  };
+  // PYTHON_FIX_STATS=1 - מדידת כללי תיקון העברית לכל מסמך (איטי יותר, לאבחון בלבד)
+  if (process.env.PYTHON_FIX_STATS) {
+    job.fix_stats = true;
+  }
+  // PYTHON_PARAGRAPH_MODE=balanced - פסקאות מאוזנות באורכן כשגמיני לא חילק (ברירת מחדל: greedy)
+  if (process.env.PYTHON_PARAGRAPH_MODE) {
+    job.paragraph_mode = process.env.PYTHON_PARAGRAPH_MODE;
+  }
+  // PYTHON_FIX_PARALLEL_MIN_CHARS=N - מאיזה אורך תמלול תיקון העברית רץ במקביל על כמה ליבות (ברירת מחדל: 100000)
+  if (process.env.PYTHON_FIX_PARALLEL_MIN_CHARS) {
+    job.fix_parallel_min_chars = parseInt(process.env.PYTHON_FIX_PARALLEL_MIN_CHARS, 10);
+  }
+  // PYTHON_WORD_TEMPLATE=<id> - תבנית מסוימת לשפות RTL (מזהים ב-TEMPLATE_FILES, ברירת מחדל: הראשונה שקיימת)
+  if (process.env.PYTHON_WORD_TEMPLATE) {
+    job.template = process.env.PYTHON_WORD_TEMPLATE;
+  }
 
-      pythonProcess.on('close', (code) => {
-        if (code === 0) {
-          try {
-            // ניסיון לפרסר את התגובה מ-Python
-            const lines = output.trim().split('\n');
-            const lastLine = lines[lines.length - 1];
-
-            if (lastLine.startsWith('{')) {
-              const result = JSON.parse(lastLine);
-              if (result.success && fs.existsSync(outputPath)) {
-                console.log(`✅ Python script completed successfully: ${outputPath}`);
-                const buffer = fs.readFileSync(outputPath);
-                // ניקוי קבצים זמניים
-                fs.unlinkSync(outputPath);
-                try { fs.unlinkSync(tempDataPath); } catch (e) {}
-                resolve(buffer);
-              } else {
-                console.error('❌ Python script failed:', result.error || 'Unknown error');
-                try { fs.unlinkSync(tempDataPath); } catch (e) {}
-                reject(new Error(result.error || 'Python script failed'));
-              }
-            } else {
-              console.log('🐍 Python output:', output);
-              if (fs.existsSync(outputPath)) {
-                const buffer = fs.readFileSync(outputPath);
-                fs.unlinkSync(outputPath);
-                try { fs.unlinkSync(tempDataPath); } catch (e) {}
-                resolve(buffer);
-              } else {
-                try { fs.unlinkSync(tempDataPath); } catch (e) {}
-                reject(new Error('Output file not created'));
-              }
-            }
-          } catch (parseError) {
-            console.error('❌ Error parsing Python output:', parseError);
-            console.log('Raw output:', output);
-            try { fs.unlinkSync(tempDataPath); } catch (e) {}
-            reject(parseError);
-          }
-        } else {
-          console.error(`❌ Python script exited with code ${code}`);
-          console.error('Error output:', errorOutput);
-          console.log('Standard output:', output);
-          try { fs.unlinkSync(tempDataPath); } catch (e) {}
-          reject(new Error(`Python script failed with code ${code}: ${errorOutput}`));
+  let response;
+  try {
+    console.log(`🐍 Creating Word document using Python worker for: ${cleanName} (Language: ${language})`);
+    response = await runPythonWorkerJob(job);
+  } catch (workerError) {
+    console.warn('⚠️ Python worker unavailable, falling back to one-shot Python process:', workerError.message);
+    return await createWordDocumentPythonOneShot(transcription, filename, duration, language);
+  }
+
+  logPythonTimings(cleanName, response.result.timings);
+
+  if (response.result.fix_stats) {
+    const slowest = Object.entries(response.result.fix_stats.rules)
+      .sort((a, b) => b[1].ms - a[1].ms)
+      .slice(0, 5)
+      .map(([name, counters]) => `${name}: ${counters.ms}ms, ${counters.hits} hits`);
+    console.log(`📊 Hebrew fix rules (${response.result.fix_stats.ms}ms total), slowest:\n  ${slowest.join('\n  ')}`);
+  }
+
+  if (response.result.success && response.document) {
+    console.log(`✅ Python worker completed successfully: ${cleanName} (${response.document.length} bytes)`);
+    return response.document;
+  }
+
+  console.error('❌ Python worker job failed:', response.result.error || 'Unknown error');
+  throw new Error(response.result.error || 'Python script failed');
+}
+
+// Python-based Word document creation - תהליך Python חדש לכל מסמך (generate_word_doc.py --stdio)
+async function createWordDocumentPythonOneShot(transcription, filename, duration, language = 'Hebrew') {
+  const cleanName = cleanFilename(filename);
+  console.log(`🐍 Creating Word document using Python for: ${cleanName} (Language: ${language})`);
+
+  // הנתונים עוברים ב-stdin והמסמך חוזר ב-stdout - אין קבצים זמניים שיכולים לדלוף
+  const pythonData = JSON.stringify({
+    transcription: transcription,
+    title: cleanName,
+    language: language || 'Hebrew'
+  });
+
+  return new Promise((resolve, reject) => {
+    const pythonCmd = process.platform === 'win32' ? 'python' : 'python3';
+    // -m: ה-bytecode המקומפל מראש נטען במקום קומפילציה של הסקריפט בכל הפעלה
+    const pythonProcess = spawn(pythonCmd, ['-m', 'generate_word_doc', '--stdio'], {
+      cwd: __dirname,
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    let document = null;
+    let result = null;
+    let errorOutput = '';
+
+    pythonProcess.stdout.on('data', createPythonFrameReader((kind, payload) => {
+      if (kind === 'D') {
+        document = Buffer.from(payload);
+      } else {
+        try {
+          result = JSON.parse(payload.toString('utf8'));
+        } catch (parseError) {
+          console.error('❌ Error parsing Python result frame:', parseError);
         }
-      });
+      }
+    }));
 
-      pythonProcess.on('error', (error) => {
-        console.error('❌ Error spawning Python process:', error);
-        try { fs.unlinkSync(tempDataPath); } catch (e) {}
-        reject(error);
-      });
+    pythonProcess.stderr.on('data', (data) => {
+      errorOutput += data.toString();
     });
 
-  } catch (error) {
-    console.error('❌ Error in Python Word document creation:', error);
-    throw error;
-  }
+    pythonProcess.on('close', (code) => {
+      if (result) {
+        logPythonTimings(cleanName, result.timings);
+      }
+      if (result && result.success && document) {
+        console.log(`✅ Python script completed successfully: ${cleanName} (${document.length} bytes)`);
+        resolve(document);
+      } else if (result) {
+        console.error('❌ Python script failed:', result.error || 'Unknown error');
+        reject(new Error(result.error || 'Python script failed'));
+      } else {
+        console.error(`❌ Python script exited with code ${code}`);
+        console.error('Error output:', errorOutput);
+        reject(new Error(`Python script failed with code ${code}: ${errorOutput}`));
+      }
+    });
+
+    pythonProcess.on('error', (error) => {
+      console.error('❌ Error spawning Python process:', error);
+      reject(error);
+    });
+
+    // Python שיצא מוקדם (שגיאת import, מפרש לא תקין) - EPIPE על stdin לא מפיל את השרת
+    pythonProcess.stdin.on('error', (error) => {
+      console.error('❌ Error writing to Python process:', error.message);
+      reject(error);
+    });
+
+    pythonProcess.stdin.end(pythonData, 'utf8');
+  });
 }
 
 // Fallback method using HTML-to-DOCX
@@ -3810,8 +3994,8 @@ app.get('/test-python', async (req, res) => {
     const pythonCmd = process.platform === 'win32' ? 'python' : 'python3';
     const pythonProcess = spawn(pythonCmd, ['-c', `
 import sys
-from docx import Document
-print("Python and python-docx are working!")
+import generate_word_doc
+print("Python and generate_word_doc are working!")
 print(f"Python version: {sys.version}")
     `]);
 
@@ -3831,7 +4015,7 @@ print(f"Python version: {sys.version}")
         res.json({
           success: true,
           output: output.trim(),
-          message: 'Python and python-docx integration working!'
+          message: 'Python and generate_word_doc integration working!'
         });
       } else {
         res.status(500).json({
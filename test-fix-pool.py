@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# בדיקה שמאגר התיקון המקבילי מתאושש כשתהליך בו מת: המשימה אחרי ה-kill מתוקנת בתהליך עצמו,
+# והמשימה שאחריה מקבלת מאגר חדש - ושתיהן זהות לתיקון בלי מאגר
+import sys
+import os
+import json
+import signal
+
+# הוספת הנתיב הנוכחי למסלול הPython
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import generate_word_doc
+from generate_word_doc import fix_hebrew_punctuation, iter_parallel_fixes, split_fix_shards
+
+with open(os.path.join(BASE_DIR, 'test_full_shiur.json'), 'r', encoding='utf-8') as f:
+    text = json.load(f)['transcription']
+shards = split_fix_shards(' '.join([text] * 20), shard_chars=2000)
+expected = [fix_hebrew_punctuation(shard) for shard in shards]
+
+failed = False
+first_pool = None
+for job in ('warm pool', 'after kill', 'fresh pool'):
+    try:
+        fixed = list(iter_parallel_fixes(shards, workers=2))
+    except Exception as e:
+        print(f"❌ {job}: {type(e).__name__}: {str(e)}")
+        failed = True
+        continue
+    pool = generate_word_doc._FIX_POOL
+    print(f"{job}: {len(shards)} shards, pool {'discarded' if pool is None else 'same' if pool is first_pool else 'new'}")
+    if fixed != expected:
+        print(f"❌ {job}: fixed text differs from fix_hebrew_punctuation")
+        failed = True
+
+    if job == 'warm pool':
+        # הורגים את תהליכי המאגר כמו OOM killer
+        first_pool = generate_word_doc._FIX_POOL
+        for process in list(first_pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+
+if generate_word_doc._FIX_POOL is None or generate_word_doc._FIX_POOL is first_pool:
+    print("❌ the broken pool was not replaced")
+    failed = True
+
+if failed:
+    sys.exit(1)
+print(f"\nFix pool test completed!")
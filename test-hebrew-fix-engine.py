@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# בדיקה שרצפי LiteralRule שמאוחדים ל-MultiReplaceRule (MULTI_REPLACE_MIN_RULES) נותנים
+# בדיוק את אותה תוצאה כמו הרצת הכללים אחד אחרי השני
+# הטקסטים: התמלולים לדוגמה, וכל מחרוזת של הכללים בתוך משפט, לבד, בצמדים ועם גרשיים מסביב
+import sys
+import os
+import json
+
+# הוספת הנתיב הנוכחי למסלול הPython
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from generate_word_doc import get_hebrew_fix_engine, MultiReplaceRule
+
+
+def load_fixture(name):
+    with open(os.path.join(BASE_DIR, name), 'r', encoding='utf-8') as f:
+        return json.load(f)['transcription']
+
+
+def sequential(rules, text):
+    for rule in rules:
+        text = rule.apply(text)
+    return text
+
+
+merged = [rule for rule in get_hebrew_fix_engine().rules if isinstance(rule, MultiReplaceRule)]
+print(f"Merged literal runs: {', '.join(rule.name for rule in merged)}")
+
+failed = not merged
+if not merged:
+    print("❌ no MultiReplaceRule in the engine - the merged path does not run")
+
+fixtures = [load_fixture(name) for name in ('test_500_words.json', 'test_full_shiur.json')]
+for rule in merged:
+    literals = [literal.wrong for literal in rule.rules]
+    texts = list(fixtures)
+    texts += [f'אמר {wrong} והלך.' for wrong in literals]
+    texts += [f'{first}{second} {first} {second}' for first in literals for second in literals]
+    # גרשיים מסביב: הסרה של כלל אחד יוצרת התאמה לכלל אחר - כאן הסדר קובע
+    texts += [f'"{first}" "{first}"{second}"' for first in literals for second in literals]
+    texts.append(' '.join(literals))
+
+    mismatches = [text for text in texts if rule.apply(text) != sequential(rule.rules, text)]
+    print(f"{rule.name}: {len(texts)} texts, {len(mismatches)} mismatches")
+    if mismatches:
+        print(f"❌ first mismatch: {mismatches[0][:200]!r}")
+        failed = True
+
+    # אותה תוצאה גם במצב המדידה (fix_stats)
+    counted = [text for text in fixtures if rule.apply_counted(text)[0] != sequential(rule.rules, text)]
+    if counted:
+        print(f"❌ {rule.name}: apply_counted differs on {len(counted)} fixtures")
+        failed = True
+
+if failed:
+    sys.exit(1)
+print(f"\nFix engine test completed!")
@@ -2,29 +2,99 @@
 # -*- coding: utf-8 -*-
 
 # בדיקה של האלגוריתם החדש לפסקאות
+# הטקסטים: test_500_words.json (הטקסט הבעייתי של 500 מילים) ו-test_full_shiur.json
+# אותם קבצים משמשים גם למדידה: python3 benchmark-word-doc.py segment
 import sys
 import os
+import json
 
 # הוספת הנתיב הנוכחי למסלול הPython
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
 
-from generate_word_doc import create_smart_paragraphs_python
+from generate_word_doc import (create_smart_paragraphs_python, fix_hebrew_punctuation, paragraph_text,
+                               sentence_spans, PARAGRAPH_MIN_CHARS, PARAGRAPH_MIN_SENTENCES)
 
-# הטקסט הבעייתי של 500 מילים
-text = """אני רוצה לספר לכם, שנייה, אני אמצא. כן. כתב השולחן ערוך בהלכות יום כיפור תרכ"א: נהגו לדור צדקות ביום הכיפורים בעד המתים. כותב שם המשנה ברורה, שגם המתים מתכפרים ביום הכיפורים כשנודרים בעבורם. ולמה? כי אנחנו אומרים, אם הוא היה ממשיך לחיות, הוא גם היה נותן צדקה. ואפילו היה עני, והוא לא יכל לתת צדקה כי לא היה לו ממה לתת, אומר המשנה ברורה, הוא היה טהור לב והוא היה רוצה לתת צדקה. אומר המשנה ברורה משהו מזעזע. אבל אם נותנים צדקה בעבור רשע, לא מועיל לו. אבל אם התוודה, אותו רשע קודם מותו, יש לומר שיש לו כפרה או כצדיק חשוב. אני רוצה להדגיש, כל זה שאני נותן עבור רשע אחר. אבל בן שנותן עבור אביו הרשע, בן כרעא דאבוה, כן יכול לכפר גם אם אביו רשע. אבל כתוב פה דבר נורא. אני רוצה לתת צדקה לעילוי נשמת רשע, לא יכול להיות. מי נקרא אבל צדיק? התוודה לפני מותו. רשע אחד שהתוודה. אני מכיר יהודי שהיה כופר גדול, צרפתי. שתי בנותיו חזרו בתשובה. הוא לא היה מוכן לקבל שהבנות שלו שהוא ציפה שיהיו רופאות בכירות, חזרו בתשובה. נשואות אברכים, בנים ונכדים. בערוב ימיו הוא חלה במחלה סופנית. הוא לא מצא טעם בחייו, לא היה אכפת לו למות, והוא כל הזמן דחק ברופאים שינתקו אותו ממכשירי הנשמה, כי הוא לא רוצה לחיות. הבנות שלו עזבו אותו, הנכדים שלו לא הולכים בדרך שלו, אין לו טעם בחיים. באו אליו הבנות, אמרו לו, גם אם אתה רוצה למות, תחשוב על הבנות שלך. אנחנו רוצות את אבא שלנו חי. והצליחו לשכנע אותו שיישאר מחובר למכונות. יום אחד הגריע עליו רופאה דתייה שעבדה באותו בית חולים. אמרה לו, תראה איזה בנות נחמדות יש לך. איזה נכדים מתוקים, תראה איזה נחת. מה אתה מעדיף שהם יסתובבו עם סמים בהודו הרחוקה? אתה היית רוצה שיסתובבו כהומלסים בכל מיני מקומות עם אנשים משונים ויחפשו כל מיני ערכים ריקים ונבובים? תשמח שאתה, הם יהודים. הם דואגים לך, תראה כמה שניתקת איתם קשר, איך הם באות, מטפלות בך, דואגות לך. הוא שמע את הדברים, פרץ בבכי, אמר אני באמת מתחרט על חיי. הייתי טיפש, הייתי רק עצלן מלעשות גם אני מעשה כמו הבנות שלי ולשוב אל השם. אומר, יכלתי לחיות איתם באהבה, בחום. הוא אומר, וניתקתי, בזבזתי את חיי. היה בוכה על כל החיים המבוזבזים. שלוש שעות אחר כך הוא נפטר. היהודי הזה נפטר מתוך וידוי של תשובה. איך קוראים לו בשמיים? אדם שניתק קשר עם בנות, רוצה למות. צדיק. למה? כי הוא הרהר תשובה. תשמעו את המתנה ששמה תשובה. כמה זה חשוב, כמה זה חשוב. הגר זורקת את ישמעאל תחת אחת השיחים, הורגת את הבן שלה. ותלך ותתע, חוזרת לגילולי בית אביה. פתאום באים המלאכים. נשבר לה הלב, בכתה, היה לה הרהור תשובה. מעבודה זרה, כמעט רוצחת. פוקח השם את עיניה, רואה באר מים חיים. מה זה כוח של בכי? מה הוא כוחו של הרהור תשובה? זה התורה מלמדת אותנו כמה אדם צריך להתחזק. לא סתם קוראים את הפרשה של הגר ביום א' של ראש השנה, כי אנחנו רוצים ללמד לכל אחד ואחד מאיתנו, מה הוא כוחו של תשובה? מה היא כוחה של תשובה? זה אדם צריך תמיד לדעת ולראות. כל הלשון, עולם שלם של תוכן איכותי."""
+# החלוקה הצפויה עם ברירות המחדל (4 משפטים, 400 תווים) - spans בטקסט אחרי fix_hebrew_punctuation,
+# כמו ב-iter_paragraph_xml. בשניהם יש ראשי תיבות עם גרשיים (תרכ"א, חז"ל) שלא חוסמים את החלוקה
+EXPECTED = {
+    'test_500_words.json': [(0, 405), (406, 825), (826, 1243), (1244, 1654), (1655, 2062), (2063, 2500),
+                            (2501, 2587)],
+    'test_full_shiur.json': [(0, 474), (475, 950), (951, 1390), (1391, 1805), (1806, 2225),
+                             (2226, 2645), (2646, 3052), (3053, 3466), (3467, 3915), (3916, 3981)],
+}
 
-print("Testing Python paragraph algorithm...")
-print(f"Original text: {len(text.split())} words")
 
-# הרצת האלגוריתם
-paragraphs = create_smart_paragraphs_python(text)
+def load_fixture(name, fixed=True):
+    with open(os.path.join(BASE_DIR, name), 'r', encoding='utf-8') as f:
+        text = json.load(f)['transcription']
+    return fix_hebrew_punctuation(text) if fixed else text
 
-print(f"\nResults:")
-print(f"Total paragraphs: {len(paragraphs)}")
 
-for i, paragraph in enumerate(paragraphs):
-    word_count = len(paragraph.split())
-    print(f"\nParagraph {i + 1}: {word_count} words")
-    print(f"First 100 chars: \"{paragraph[:100]}...\"")
+failed = False
+for name, expected in EXPECTED.items():
+    text = load_fixture(name)
 
-print(f"\nAlgorithm test completed!")
\ No newline at end of file
+    print(f"Testing Python paragraph algorithm on {name}...")
+    print(f"Original text: {len(text.split())} words")
+
+    # הרצת האלגוריתם
+    spans = create_smart_paragraphs_python(text)
+
+    print(f"\nResults:")
+    print(f"Total paragraphs: {len(spans)}")
+
+    for i, span in enumerate(spans):
+        paragraph = paragraph_text(text, span)
+        word_count = len(paragraph.split())
+        print(f"\nParagraph {i + 1}: {word_count} words")
+        print(f"First 100 chars: \"{paragraph[:100]}...\"")
+
+    if spans != expected:
+        print(f"\n❌ {name}: expected {expected}, got {spans}")
+        failed = True
+    # כל פסקה חוץ מהאחרונה עומדת במינימום - לא גוש אחד של כל הטקסט
+    too_short = [span for span in spans[:-1] if span[1] - span[0] < PARAGRAPH_MIN_CHARS
+                 or len(list(sentence_spans(paragraph_text(text, span)))) < PARAGRAPH_MIN_SENTENCES]
+    if len(spans) < 2 or too_short:
+        print(f"\n❌ {name}: expected real paragraph breaks, got {spans}")
+        failed = True
+    print()
+
+# פרמטרים אחרים: פסקאות ארוכות יותר = פחות פסקאות
+text = load_fixture('test_full_shiur.json')
+default_count = len(create_smart_paragraphs_python(text))
+longer_count = len(create_smart_paragraphs_python(text, min_sentences=8, min_chars=800))
+print(f"min_sentences=8, min_chars=800: {longer_count} paragraphs (defaults: {default_count})")
+if not longer_count < default_count:
+    print("❌ longer targets should give fewer paragraphs")
+    failed = True
+
+
+# balanced: כשאין שבירה חוקית בחלון הפסקה נמשכת - לא נסגרות פסקאות מתחת למינימום
+def short_paragraphs(text):
+    spans = create_smart_paragraphs_python(text, mode='balanced')
+    if len(spans) == 1:
+        return []
+    lengths = [(end - start, len(list(sentence_spans(text[start:end])))) for start, end in spans]
+    return [(chars, sentences) for chars, sentences in lengths if chars < 400 or sentences < 4]
+
+BALANCED_CASES = {
+    # מרכאות לא סגורות אחרי שני משפטים קצרים ("כן.")
+    'unmatched quote in 500 words': load_fixture('test_500_words.json', fixed=False).replace('תרכ"א', 'תרכ "א'),
+    # שלושה משפטים ואחריהם ציטוט שלא נסגר עד הסוף - פסקה אחת, כמו ב-greedy
+    'three sentences, open quote': ' '.join(['שלום עולם ומלואו.'] * 3) + ' ויאמר "הנה '
+                                   + ' '.join(['מילה אחת ועוד מילה ארוכה.'] * 150),
+    # משפט קצר ואחריו משפט ארוך מחלון החיפוש
+    'sentence longer than the window': 'א' * 184 + '. ' + 'ב' * 1200 + '. ' + ' '.join(['ג' * 90 + '.'] * 7),
+}
+for name, text in BALANCED_CASES.items():
+    short = short_paragraphs(text)
+    print(f"balanced, {name}: {len(create_smart_paragraphs_python(text, mode='balanced'))} paragraphs")
+    if short:
+        print(f"❌ balanced, {name}: paragraphs below the minimums {short}")
+        failed = True
+
+if failed:
+    sys.exit(1)
+print(f"\nAlgorithm test completed!")